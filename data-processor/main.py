@@ -1,19 +1,31 @@
 import asyncio
-import json
+import msgspec
 import websockets
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+from dataclasses import dataclass
 from datetime import datetime
 import logging
-from typing import Dict, Optional, Tuple, List, Set
+import os
+import time
+import numpy as np
+import redis.asyncio as redis
+from typing import Dict, Optional, Tuple, List
+try:
+    from numba import njit, prange
+except ImportError:
+    # Without numba the tick kernel runs as plain Python
+    prange = range
+    def njit(*args, **kwargs):
+        return lambda func: func
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; deployments can set LOG_LEVEL=WARNING to skip the per-tick INFO logs
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Stock Data Consumer Service")
+app = FastAPI(title="Stock Data Consumer Service", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -24,299 +36,647 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store active WebSocket connections
-active_connections: Set[WebSocket] = set()
+# How long to wait for further queued ticks before processing the latest one
+TICK_DRAIN_TIMEOUT = 0.001
+# Reconnect delays to the data service, doubling after every failed attempt
+MIN_RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 30
+
+# Optional Redis server shared by all workers. Without it, every worker consumes
+# the data service on its own
+REDIS_URL = os.environ.get("REDIS_URL")
+# Only the worker holding the lock consumes the data service and publishes processed ticks
+PROCESSOR_LOCK_KEY = "trend-detector:processor"
+PROCESSOR_LOCK_TIMEOUT = 10
+TICK_CHANNEL = "trend-detector:ticks"
+LATEST_TICK_KEY = "trend-detector:latest-tick"
+redis_client: Optional[redis.Redis] = redis.from_url(REDIS_URL) if REDIS_URL else None
+
+# Store active WebSocket connections with the queue of frames waiting to be sent to each
+# and the format it asked for, "json" or "msgpack" with /ws?fmt=msgpack
+active_connections: Dict[WebSocket, Tuple[asyncio.Queue, str]] = {}
+# How many frames may wait for a slow client before its oldest frame is dropped
+CLIENT_QUEUE_SIZE = 32
+
+class StockInfo(msgspec.Struct):
+    """A stock's quote in a tick from the data service"""
+    price: Optional[float] = None
+    sec_type: Optional[str] = None
+    price_type: Optional[str] = None
+
+class TradingData(msgspec.Struct):
+    """The quotes of all stocks at one trading time"""
+    trading_time: Optional[str] = None
+    trading_date: Optional[str] = None
+    stocks: Dict[str, StockInfo] = {}
+
+class TickMessage(msgspec.Struct):
+    """A MessagePack frame broadcast by the data service"""
+    timestamp: Optional[str] = None
+    data: TradingData = msgspec.field(default_factory=TradingData)
+
+tick_decoder = msgspec.msgpack.Decoder(TickMessage)
+
+@dataclass(slots=True)
+class StockTick:
+    """Processed values of a stock for the latest tick, reused across ticks"""
+    stock_id: str
+    current_price: Optional[float] = None
+    ema38: Optional[float] = None
+    ema100: Optional[float] = None
+    is_bullish_breakout: bool = False
+    is_bearish_breakout: bool = False
+    price_change: Optional[float] = None
+    price_change_percent: Optional[float] = None
+    samples_collected: int = 0
+
+class ProcessedTick(msgspec.Struct):
+    """A processed tick as published to the other workers"""
+    timestamp: Optional[str] = None
+    trading_time: Optional[str] = None
+    trading_date: Optional[str] = None
+    stocks: List[StockTick] = []
+
+processed_tick_decoder = msgspec.msgpack.Decoder(ProcessedTick)
+
+class StockOut(msgspec.Struct, kw_only=True, omit_defaults=True):
+    """A stock in the /api/stocks response; missing values are left out"""
+    stock_id: str
+    timestamp: Optional[str] = None
+    trading_time: Optional[str] = None
+    trading_date: Optional[str] = None
+    current_price: Optional[float] = None
+    ema38: Optional[float] = None
+    ema100: Optional[float] = None
+    is_bullish_breakout: bool
+    is_bearish_breakout: bool
+    price_change: Optional[float] = None
+    price_change_percent: Optional[float] = None
+
+class StocksResponse(msgspec.Struct):
+    """The /api/stocks response"""
+    timestamp: Optional[str]
+    stocks: List[StockOut]
+
+class BreakoutOut(msgspec.Struct):
+    """A stock in the /api/breakouts response"""
+    stock_id: str
+    is_bullish_breakout: bool
+    is_bearish_breakout: bool
+    current_price: Optional[float]
+    ema38: Optional[float]
+    ema100: Optional[float]
+    trading_time: Optional[str]
+
+class BreakoutsResponse(msgspec.Struct):
+    """The /api/breakouts response"""
+    timestamp: Optional[str]
+    breakouts: List[BreakoutOut]
+
+class StockEmaData(msgspec.Struct):
+    """EMA and price values of a stock in the /api/stocks/{stock_id}/ema response"""
+    current_price: Optional[float]
+    ema38: Optional[float]
+    ema100: Optional[float]
+    is_bullish_breakout: bool
+    is_bearish_breakout: bool
+    price_change: Optional[float]
+    price_change_percent: Optional[float]
+    samples_collected: int
+
+class ClientStock(msgspec.Struct):
+    """A stock in a frame sent to the frontend"""
+    stock_id: str
+    current_price: Optional[float]
+    ema38: Optional[float]
+    ema100: Optional[float]
+    is_bullish_breakout: bool
+    is_bearish_breakout: bool
+    price_change: Optional[float]
+    price_change_percent: Optional[float]
+    trading_time: Optional[str]
+    breakout: Optional[str]
+
+class ClientFrame(msgspec.Struct):
+    """A frame sent to the frontend"""
+    timestamp: Optional[str]
+    stocks: List[ClientStock]
+
+class StockEmaResponse(msgspec.Struct):
+    """The /api/stocks/{stock_id}/ema response"""
+    stock_id: str
+    timestamp: Optional[str]
+    trading_time: Optional[str]
+    trading_date: Optional[str]
+    data: StockEmaData
+
+# Shared by all JSON payloads, so encoding reuses one output buffer
+json_encoder = msgspec.json.Encoder()
+# Encodes frontend frames for clients that asked for MessagePack
+msgpack_encoder = msgspec.msgpack.Encoder()
 
 # Store the latest tick data
 latest_tick_data: Dict = {}
-# Store historical prices for each stock
-stock_prices: Dict[str, list] = {}
-# Store previous EMAs for each stock (both 38 and 100 periods)
-previous_emas_38: Dict[str, float] = {}
-previous_emas_100: Dict[str, float] = {}
-# Store previous crossover states to detect changes
-previous_states: Dict[str, str] = {}  # 'bullish', 'bearish', or None
-
-def validate_float(value: float) -> Optional[float]:
-    """Validate and sanitize float values for JSON compliance"""
-    try:
-        if value is None:
-            return None
-        float_val = float(value)
-        # Check for non-finite values
-        if float_val in (float('inf'), float('-inf')) or float_val != float_val:  # last condition checks for NaN
-            return None
-        # Round to reasonable precision to avoid floating point issues
-        return round(float_val, 4)
-    except (ValueError, TypeError):
-        return None
-
-def calculate_ema(stock_id: str, current_price: float, period: int, ema_dict: Dict[str, float]) -> float:
-    """
-    Calculate EMA according to the formula:
-    EMAᵗₛ,ᵢ = (closeₛ,ᵢ * (2/(1+j))) + EMAᵗ⁻¹ₛ,ᵢ * (1 - (2/(1+j)))
-    """
-    if stock_id not in ema_dict or ema_dict[stock_id] == 0:
-        # Initialize with current price if no previous EMA
-        ema_dict[stock_id] = current_price
-        return current_price
-    
-    # Calculate multiplier (2/(1+j))
-    multiplier = 2 / (1 + period)
+# Store the stocks of the latest tick by stock ID
+latest_stock_by_id: Dict[str, StockTick] = {}
+# Store one StockTick per stock, updated in place on every tick. Values are
+# validated once at ingest, so they are either None or finite and rounded
+tick_pool: Dict[str, StockTick] = {}
+# Store the serialized /, /api/stocks and /api/breakouts responses for the latest tick
+cached_root: Optional[bytes] = None
+cached_api_stocks: Optional[bytes] = None
+cached_api_breakouts: Optional[bytes] = None
+# Store the serialized frontend frame for the latest tick, shared by broadcasts and new clients
+cached_client_frame: Optional[bytes] = None
+cached_client_frame_msgpack: Optional[bytes] = None
+# Map each stock to its row in the per-stock state arrays below
+stock_index: Dict[str, int] = {}
+# Rows are allocated in multiples of this many stocks
+STATE_GROWTH_BLOCK = 64
+# EMA smoothing multipliers 2/(1+j) for j=38 and j=100, and the weights of the previous EMA.
+# Numba freezes these as compile-time constants in update_tick_state
+EMA_MULTIPLIER_38 = 2 / (1 + 38)
+EMA_DECAY_38 = 1 - EMA_MULTIPLIER_38
+EMA_MULTIPLIER_100 = 2 / (1 + 100)
+EMA_DECAY_100 = 1 - EMA_MULTIPLIER_100
+# Store the last PRICE_HISTORY_SIZE prices for each stock as a ring buffer,
+# with the total number of prices written per stock as the write position
+PRICE_HISTORY_SIZE = 100
+price_history: np.ndarray = np.zeros((0, PRICE_HISTORY_SIZE), dtype=np.float64)
+samples_written: np.ndarray = np.zeros(0, dtype=np.int64)
+# Store previous EMAs for each stock (both 38 and 100 periods), 0 until the first price
+previous_emas_38: np.ndarray = np.zeros(0, dtype=np.float64)
+previous_emas_100: np.ndarray = np.zeros(0, dtype=np.float64)
+# Store previous crossover states to detect changes: 1 bullish, -1 bearish, 0 none
+previous_states: np.ndarray = np.zeros(0, dtype=np.int8)
+
+def validate_floats(values: np.ndarray) -> np.ndarray:
+    """Validate and sanitize float values for JSON compliance, with NaN marking invalid values"""
+    # Round to reasonable precision to avoid floating point issues
+    result = np.round(values, 4)
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+def to_optional_list(values: np.ndarray) -> List[Optional[float]]:
+    """Convert a float array to a list of Python floats, with NaN replaced by None"""
+    result = values.astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
+
+def get_stock_indices(stock_ids: List[str]) -> np.ndarray:
+    """Map stock IDs to rows of the state arrays, growing the arrays for unseen stocks"""
+    global price_history, samples_written, previous_emas_38, previous_emas_100, previous_states
     
-    # Calculate EMA
-    ema = (current_price * multiplier) + (ema_dict[stock_id] * (1 - multiplier))
+    for stock_id in stock_ids:
+        if stock_id not in stock_index:
+            stock_index[stock_id] = len(stock_index)
     
-    # Store for next calculation
-    ema_dict[stock_id] = ema
+    # New rows start at 0, i.e. no price history, no previous EMA and no previous crossover state.
+    # Capacity grows geometrically in blocks of STATE_GROWTH_BLOCK rows so new stocks rarely copy the arrays
+    capacity = len(previous_states)
+    if len(stock_index) > capacity:
+        new_capacity = max(2 * capacity, len(stock_index))
+        missing = -(-new_capacity // STATE_GROWTH_BLOCK) * STATE_GROWTH_BLOCK - capacity
+        price_history = np.pad(price_history, ((0, missing), (0, 0)))
+        samples_written = np.pad(samples_written, (0, missing))
+        previous_emas_38 = np.pad(previous_emas_38, (0, missing))
+        previous_emas_100 = np.pad(previous_emas_100, (0, missing))
+        previous_states = np.pad(previous_states, (0, missing))
     
-    return ema
+    return np.fromiter((stock_index[stock_id] for stock_id in stock_ids), dtype=np.intp, count=len(stock_ids))
 
-def detect_breakout_patterns(stock_id: str, ema38: float, ema100: float) -> dict:
+def reset_tick_state():
+    """Forget the price history, EMAs and crossover states of all stocks, as if no tick had been processed"""
+    global price_history, samples_written, previous_emas_38, previous_emas_100, previous_states
+    stock_index.clear()
+    tick_pool.clear()
+    price_history = np.zeros((0, PRICE_HISTORY_SIZE), dtype=np.float64)
+    samples_written = np.zeros(0, dtype=np.int64)
+    previous_emas_38 = np.zeros(0, dtype=np.float64)
+    previous_emas_100 = np.zeros(0, dtype=np.float64)
+    previous_states = np.zeros(0, dtype=np.int8)
+
+# Fast-math without "arcp" (reciprocal division), which makes np.round(x, 4) return values
+# like 78.15140000000001, and without "nnan"/"ninf", as validity is computed from NaN outside
+# The explicit signature compiles the kernel at import (or loads it from the cache),
+# so the first tick doesn't pay for JIT compilation
+@njit(
+    "void(intp[::1], float64[::1], boolean[::1], float64[:, ::1], int64[::1], float64[::1], float64[::1], int8[::1],"
+    " float64[::1], float64[::1], float64[::1], float64[::1], boolean[::1], boolean[::1])",
+    cache=True, fastmath={"contract", "nsz", "reassoc", "afn"}, parallel=True
+)
+def update_tick_state(indices, current_prices, valid, price_history, samples_written, emas_38, emas_100, states,
+                      out_ema38, out_ema100, out_price_change, out_price_change_percent, out_bullish, out_bearish):
     """
-    Detect breakout patterns based on EMA crossovers.
-    Returns a dict with boolean flags for bullish and bearish breakouts.
+    Update the price history, both EMAs and the crossover state of a batch of stocks in one pass.
+    EMAs are calculated according to the formula:
+    EMAᵗₛ,ᵢ = (closeₛ,ᵢ * (2/(1+j))) + EMAᵗ⁻¹ₛ,ᵢ * (1 - (2/(1+j)))
+    Stocks without a valid price are skipped and their outputs left untouched.
+    Stocks are updated in parallel; indices must not repeat within a batch.
     """
-    current_state = None
-    
-    if ema38 > ema100:
-        current_state = 'bullish'
-    elif ema38 < ema100:
-        current_state = 'bearish'
-    
-    # Get previous state
-    prev_state = previous_states.get(stock_id)
-    
-    # Initialize breakout flags
-    breakouts = {
-        "is_bullish_breakout": False,
-        "is_bearish_breakout": False
-    }
+    history_size = price_history.shape[1]
     
-    # Detect crossovers
-    if prev_state != current_state and prev_state is not None:
-        if current_state == 'bullish':
-            breakouts["is_bullish_breakout"] = True
-            logger.info(f"Detected BULLISH breakout for {stock_id} - EMA38: {ema38:.2f} crossed above EMA100: {ema100:.2f}")
-        elif current_state == 'bearish':
-            breakouts["is_bearish_breakout"] = True
-            logger.info(f"Detected BEARISH breakout for {stock_id} - EMA38: {ema38:.2f} crossed below EMA100: {ema100:.2f}")
-    
-    # Update state
-    previous_states[stock_id] = current_state
-    
-    return breakouts
-
-def calculate_statistics(stock_id: str, current_price: float) -> Dict:
-    """Calculate statistics for a stock based on its price history"""
-    # Validate input price first
-    safe_current_price = validate_float(current_price)
-    if safe_current_price is None:
-        return {
-            "current_price": None,
-            "price_change": None,
-            "price_change_percent": None,
-            "ema38": None,
-            "ema100": None,
-            "samples_collected": len(stock_prices.get(stock_id, [])),
-            "is_bullish_breakout": False,
-            "is_bearish_breakout": False
-        }
+    for i in prange(indices.shape[0]):
+        if not valid[i]:
+            continue
+        row = indices[i]
+        price = current_prices[i]
+        
+        # Write the price into the ring buffer, overwriting the oldest once full
+        written = samples_written[row]
+        price_history[row, written % history_size] = price
+        written += 1
+        samples_written[row] = written
+        
+        # Calculate price change if we have a previous price (prevents division by zero)
+        if written >= 2:
+            previous_price = price_history[row, (written - 2) % history_size]
+            if previous_price != 0:
+                price_change = price - previous_price
+                out_price_change[i] = price_change
+                out_price_change_percent[i] = (price_change / previous_price) * 100
+        
+        # Calculate both EMAs, initializing with the current price if no previous EMA
+        ema38 = price if emas_38[row] == 0 else (price * EMA_MULTIPLIER_38) + (emas_38[row] * EMA_DECAY_38)
+        ema100 = price if emas_100[row] == 0 else (price * EMA_MULTIPLIER_100) + (emas_100[row] * EMA_DECAY_100)
+        emas_38[row] = ema38
+        emas_100[row] = ema100
+        ema38 = np.round(ema38, 4)
+        ema100 = np.round(ema100, 4)
+        out_ema38[i] = ema38
+        out_ema100[i] = ema100
+        
+        # Only detect breakout if we have enough samples; a crossover is a change
+        # of sign against a known previous state
+        if written > 2:
+            state = np.int8(ema38 > ema100) - np.int8(ema38 < ema100)
+            previous_state = states[row]
+            crossed = (state != previous_state) & (previous_state != 0)
+            out_bullish[i] = crossed & (state == 1)
+            out_bearish[i] = crossed & (state == -1)
+            states[row] = state
+
+def batch_calculate_statistics(stock_ids: List[str], current_prices: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Calculate statistics for a batch of stocks based on their price histories.
+    current_prices holds validated prices aligned with stock_ids, NaN where a price is missing.
+    Returns arrays aligned with stock_ids; NaN marks values that could not be calculated.
+    """
+    count = len(stock_ids)
+    indices = get_stock_indices(stock_ids)
     
-    # Initialize price history for this stock if not exists
-    if stock_id not in stock_prices:
-        stock_prices[stock_id] = []
+    ema38 = np.full(count, np.nan)
+    ema100 = np.full(count, np.nan)
+    price_change = np.full(count, np.nan)
+    price_change_percent = np.full(count, np.nan)
+    is_bullish_breakout = np.zeros(count, dtype=np.bool_)
+    is_bearish_breakout = np.zeros(count, dtype=np.bool_)
     
-    stock_prices[stock_id].append(safe_current_price)
+    update_tick_state(
+        indices, current_prices, np.isfinite(current_prices),
+        price_history, samples_written, previous_emas_38, previous_emas_100, previous_states,
+        ema38, ema100, price_change, price_change_percent, is_bullish_breakout, is_bearish_breakout
+    )
     
-    # Keep only last 100 prices for moving averages
-    if len(stock_prices[stock_id]) > 100:
-        stock_prices[stock_id] = stock_prices[stock_id][-100:]
+    for i in np.flatnonzero(is_bullish_breakout | is_bearish_breakout):
+        if is_bullish_breakout[i]:
+            logger.info("Detected BULLISH breakout for %s - EMA38: %.2f crossed above EMA100: %.2f", stock_ids[i], ema38[i], ema100[i])
+        else:
+            logger.info("Detected BEARISH breakout for %s - EMA38: %.2f crossed below EMA100: %.2f", stock_ids[i], ema38[i], ema100[i])
     
+    return {
+        "ema38": ema38,
+        "ema100": ema100,
+        "price_change": np.round(price_change, 4),
+        "price_change_percent": np.round(price_change_percent, 4),
+        "samples_collected": np.minimum(samples_written[indices], PRICE_HISTORY_SIZE),
+        "is_bullish_breakout": is_bullish_breakout,
+        "is_bearish_breakout": is_bearish_breakout
+    }
+
+def build_stocks_payload(tick_data: dict) -> StocksResponse:
+    """Build the /api/stocks response for a processed tick"""
+    timestamp = tick_data.get("timestamp")
+    trading_time = tick_data.get("trading_time")
+    trading_date = tick_data.get("trading_date")
+    return StocksResponse(
+        timestamp=timestamp,
+        stocks=[
+            StockOut(
+                stock_id=stock.stock_id,
+                timestamp=timestamp,
+                trading_time=trading_time,
+                trading_date=trading_date,
+                current_price=stock.current_price,
+                ema38=stock.ema38,
+                ema100=stock.ema100,
+                is_bullish_breakout=stock.is_bullish_breakout,
+                is_bearish_breakout=stock.is_bearish_breakout,
+                price_change=stock.price_change,
+                price_change_percent=stock.price_change_percent
+            )
+            for stock in tick_data["stocks"]
+        ]
+    )
+
+def build_breakouts_payload(tick_data: dict) -> BreakoutsResponse:
+    """Build the /api/breakouts response for a processed tick"""
+    return BreakoutsResponse(
+        timestamp=tick_data.get("timestamp"),
+        breakouts=[
+            BreakoutOut(
+                stock_id=stock.stock_id,
+                is_bullish_breakout=stock.is_bullish_breakout,
+                is_bearish_breakout=stock.is_bearish_breakout,
+                current_price=stock.current_price,
+                ema38=stock.ema38,
+                ema100=stock.ema100,
+                trading_time=tick_data.get("trading_time")
+            )
+            for stock in tick_data["stocks"]
+            if stock.is_bullish_breakout or stock.is_bearish_breakout
+        ]
+    )
+
+def update_api_cache(tick_data: dict):
+    """Serialize the REST responses and the frontend frame once per tick so they can be sent as-is"""
+    global cached_root, cached_api_stocks, cached_api_breakouts, cached_client_frame, cached_client_frame_msgpack
     try:
-        # Initialize EMAs if needed
-        if stock_id not in previous_emas_38:
-            previous_emas_38[stock_id] = 0
-        if stock_id not in previous_emas_100:
-            previous_emas_100[stock_id] = 0
-        
-        # Calculate both EMAs
-        ema38 = calculate_ema(stock_id, safe_current_price, 38, previous_emas_38)
-        ema100 = calculate_ema(stock_id, safe_current_price, 100, previous_emas_100)
-        
-        # Validate EMAs
-        safe_ema38 = validate_float(ema38)
-        safe_ema100 = validate_float(ema100)
-        
-        # Initialize statistics with validated values
-        stats = {
-            "current_price": safe_current_price,
-            "ema38": safe_ema38,
-            "ema100": safe_ema100,
-            "samples_collected": len(stock_prices[stock_id]),
-            "is_bullish_breakout": False,
-            "is_bearish_breakout": False
-        }
-        
-        # Calculate price change if we have at least 2 samples
-        if len(stock_prices[stock_id]) >= 2:
-            previous_price = stock_prices[stock_id][-2]
-            if previous_price and previous_price != 0:  # Prevent division by zero
-                price_change = safe_current_price - previous_price
-                price_change_percent = (price_change / previous_price) * 100
-                
-                # Validate calculated changes
-                safe_price_change = validate_float(price_change)
-                safe_price_change_percent = validate_float(price_change_percent)
-                
-                if safe_price_change is not None:
-                    stats["price_change"] = safe_price_change
-                if safe_price_change_percent is not None:
-                    stats["price_change_percent"] = safe_price_change_percent
-        
-        # Only detect breakout if we have valid EMAs and enough samples
-        if safe_ema38 is not None and safe_ema100 is not None and len(stock_prices[stock_id]) > 2:
-            breakouts = detect_breakout_patterns(stock_id, safe_ema38, safe_ema100)
-            stats.update(breakouts)
-        
-        return stats
+        cached_root = json_encoder.encode(tick_data)
+        cached_api_stocks = json_encoder.encode(build_stocks_payload(tick_data))
+        cached_api_breakouts = json_encoder.encode(build_breakouts_payload(tick_data))
+        client_frame = format_for_clients(tick_data)
+        cached_client_frame = json_encoder.encode(client_frame)
+        # Only encode MessagePack while a client asked for it
+        if any(fmt == "msgpack" for _, fmt in active_connections.values()):
+            cached_client_frame_msgpack = msgpack_encoder.encode(client_frame)
+        else:
+            cached_client_frame_msgpack = None
     except Exception as e:
-        logger.error(f"Error calculating statistics for stock {stock_id}: {e}")
-        return {
-            "current_price": safe_current_price,
-            "price_change": None,
-            "price_change_percent": None,
-            "ema38": None,
-            "ema100": None,
-            "samples_collected": len(stock_prices[stock_id]),
-            "is_bullish_breakout": False,
-            "is_bearish_breakout": False
-        }
+        logger.error(f"Error caching API responses: {e}")
+        cached_root = None
+        cached_api_stocks = None
+        cached_api_breakouts = None
+        cached_client_frame = None
+        cached_client_frame_msgpack = None
+
+def format_for_clients(data: dict) -> ClientFrame:
+    """Format processed tick data for the frontend"""
+    trading_time = data.get("trading_time")
+    return ClientFrame(
+        timestamp=data.get("timestamp"),
+        stocks=[
+            ClientStock(
+                stock_id=stock.stock_id,
+                current_price=stock.current_price,
+                ema38=stock.ema38,
+                ema100=stock.ema100,
+                is_bullish_breakout=stock.is_bullish_breakout,
+                is_bearish_breakout=stock.is_bearish_breakout,
+                price_change=stock.price_change,
+                price_change_percent=stock.price_change_percent,
+                trading_time=trading_time,
+                # The label the frontend shows in breakout badges and alerts
+                breakout="BULLISH_BREAKOUT" if stock.is_bullish_breakout
+                else "BEARISH_BREAKOUT" if stock.is_bearish_breakout
+                else None
+            )
+            for stock in data.get("stocks", [])
+            if stock.current_price is not None
+        ]
+    )
 
 async def broadcast_to_clients(data: dict):
     """Broadcast data to all connected WebSocket clients"""
-    if not active_connections:
+    if not active_connections or cached_client_frame is None:
         return
     
-    # Format the data for the frontend
-    formatted_data = {
-        "timestamp": data.get("timestamp"),
-        "stocks": [
-            {
-                "stock_id": stock.get("stock_id"),
-                "current_price": validate_float(stock.get("current_price")),
-                "ema38": validate_float(stock.get("ema38")),
-                "ema100": validate_float(stock.get("ema100")),
-                "is_bullish_breakout": bool(stock.get("is_bullish_breakout")),
-                "is_bearish_breakout": bool(stock.get("is_bearish_breakout")),
-                "price_change": validate_float(stock.get("price_change")),
-                "price_change_percent": validate_float(stock.get("price_change_percent")),
-                "trading_time": data.get("trading_time")
-            }
-            for stock in data.get("stocks", [])
-            if stock.get("current_price") is not None
-        ]
-    }
+    # Log breakout events, skipping the scan over all stocks when INFO is disabled
+    if logger.isEnabledFor(logging.INFO):
+        for stock in data.get("stocks", []):
+            if stock.current_price is None:
+                continue
+            if stock.is_bullish_breakout:
+                logger.info("🚨 %s: Bullish breakout detected at price %s", stock.stock_id, stock.current_price)
+            elif stock.is_bearish_breakout:
+                logger.info("🚨 %s: Bearish breakout detected at price %s", stock.stock_id, stock.current_price)
     
-    # Log breakout events
-    for stock in formatted_data["stocks"]:
-        if stock["is_bullish_breakout"]:
-            logger.info(f"🚨 {stock['stock_id']}: Bullish breakout detected at price {stock['current_price']}")
-        elif stock["is_bearish_breakout"]:
-            logger.info(f"🚨 {stock['stock_id']}: Bearish breakout detected at price {stock['current_price']}")
+    # Queue the frame serialized for this tick for all connected clients, so a slow
+    # client only delays its own frames
+    for queue, fmt in active_connections.values():
+        if queue.full():
+            queue.get_nowait()
+            logger.warning("Client is falling behind, dropping its oldest frame")
+        queue.put_nowait(cached_client_frame_msgpack if fmt == "msgpack" else cached_client_frame)
+
+async def send_queued_frames(websocket: WebSocket, queue: asyncio.Queue):
+    """Send the frames queued for a client until sending fails"""
+    try:
+        while True:
+            message = await queue.get()
+            # Every frame is a full snapshot, so frames that queued up while the client
+            # was busy are coalesced into a single send of the newest one
+            while not queue.empty():
+                message = queue.get_nowait()
+            await websocket.send_bytes(message)
+    except Exception as e:
+        logger.error(f"Error broadcasting to client: {e}")
+        active_connections.pop(websocket, None)
+
+async def apply_tick(tick_data: dict):
+    """Make a processed tick the latest one of this worker and send it to its clients"""
+    global latest_tick_data, latest_stock_by_id
+    latest_tick_data = tick_data
+    latest_stock_by_id = {stock.stock_id: stock for stock in tick_data["stocks"]}
+    update_api_cache(tick_data)
+    await broadcast_to_clients(tick_data)
+
+def decode_processed_tick(message: bytes) -> dict:
+    """Decode a processed tick published by the worker consuming the data service"""
+    tick = processed_tick_decoder.decode(message)
+    return {
+        "timestamp": tick.timestamp,
+        "trading_time": tick.trading_time,
+        "trading_date": tick.trading_date,
+        "stocks": tick.stocks
+    }
+
+async def publish_tick(tick_data: dict):
+    """Hand a processed tick to every worker, or only to this one when running without Redis"""
+    if redis_client is None:
+        await apply_tick(tick_data)
+        return
     
-    # Send to all connected clients
-    for connection in active_connections.copy():
+    message = msgspec.msgpack.encode(tick_data)
+    await redis_client.set(LATEST_TICK_KEY, message)
+    await redis_client.publish(TICK_CHANNEL, message)
+
+async def subscribe_to_ticks():
+    """Apply the ticks published through Redis, starting from the latest stored one"""
+    while True:
+        try:
+            message = await redis_client.get(LATEST_TICK_KEY)
+            if message is not None:
+                await apply_tick(decode_processed_tick(message))
+            
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(TICK_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        await apply_tick(decode_processed_tick(message["data"]))
+        except Exception as e:
+            logger.error(f"Tick subscription error: {e}")
+            await asyncio.sleep(MIN_RECONNECT_DELAY)
+
+async def run_tick_processor():
+    """Consume the data service in whichever worker holds the processor lock, taking over when it expires"""
+    lock = redis_client.lock(PROCESSOR_LOCK_KEY, timeout=PROCESSOR_LOCK_TIMEOUT, thread_local=False)
+    while True:
         try:
-            await connection.send_json(formatted_data)
+            if await lock.acquire(blocking=False):
+                logger.info("Acquired processor lock, consuming the data service in this worker")
+                # Ticks processed by other workers while this one didn't hold the lock are
+                # missing from its state, so start over instead of resuming from stale EMAs
+                reset_tick_state()
+                consumer = asyncio.create_task(connect_to_broadcaster())
+                try:
+                    while True:
+                        await asyncio.sleep(PROCESSOR_LOCK_TIMEOUT / 3)
+                        await lock.reacquire()
+                finally:
+                    consumer.cancel()
         except Exception as e:
-            logger.error(f"Error broadcasting to client: {e}")
-            active_connections.remove(connection)
+            logger.error(f"Lost processor lock: {e}")
+        await asyncio.sleep(PROCESSOR_LOCK_TIMEOUT / 3)
+
+async def receive_latest_tick(websocket) -> bytes:
+    """Receive the next tick, skipping older ticks that queued up while the last one was processed"""
+    # Ticks are MessagePack, so always receive raw bytes, even from a text frame.
+    # recv(decode=False) needs the asyncio client of websockets 14 or later
+    data = await websocket.recv(decode=False)
+    skipped = 0
+    while True:
+        try:
+            next_data = await asyncio.wait_for(websocket.recv(decode=False), timeout=TICK_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            break
+        data = next_data
+        skipped += 1
+    
+    if skipped:
+        logger.info("Skipped %d stale ticks", skipped)
+    return data
 
 async def connect_to_broadcaster():
     """Connect to the broadcasting service and process stock data"""
+    reconnect_delay = MIN_RECONNECT_DELAY
     while True:
         try:
-            async with websockets.connect('ws://localhost:8000/ws/stocks') as websocket:
+            # The data service runs on the same host, so compressing ticks would only cost CPU
+            async with websockets.connect('ws://localhost:8000/ws/stocks', max_size=None, compression=None) as websocket:
                 logger.info("Connected to data service successfully")
+                reconnect_delay = MIN_RECONNECT_DELAY
                 logger.info("Monitoring for EMA crossover patterns (j₁=38, j₂=100)")
                 
                 while True:
-                    data = await websocket.recv()
-                    parsed_data = json.loads(data)
+                    data = await receive_latest_tick(websocket)
+                    try:
+                        tick = tick_decoder.decode(data)
+                    except msgspec.DecodeError as e:
+                        logger.error(f"Skipping malformed tick: {e}")
+                        continue
                     
-                    trading_data = parsed_data.get("data", {})
-                    trading_time = trading_data.get("trading_time")
-                    trading_date = trading_data.get("trading_date")
-                    stocks_data = trading_data.get("stocks", {})
+                    trading_time = tick.data.trading_time
+                    trading_date = tick.data.trading_date
+                    stocks_data = tick.data.stocks
                     
-                    logger.info(f"\nProcessing data for {len(stocks_data)} stocks at {trading_time}")
+                    # Process all stocks of this tick as one batch
+                    started = time.perf_counter()
+                    stock_ids = list(stocks_data)
+                    # Missing prices (None) become NaN
+                    current_prices = validate_floats(np.array(
+                        [stocks_data[stock_id].price for stock_id in stock_ids],
+                        dtype=np.float64
+                    ))
+                    stats = batch_calculate_statistics(stock_ids, current_prices)
                     
-                    # Process each stock
                     processed_stocks = []
-                    for stock_id, stock_info in stocks_data.items():
-                        try:
-                            current_price = float(stock_info.get("price")) if stock_info.get("price") is not None else None
-                            stats = calculate_statistics(stock_id, current_price)
-                            
-                            processed_stock = {
-                                "stock_id": stock_id,
-                                "current_price": stats.get("current_price"),
-                                "ema38": stats.get("ema38"),
-                                "ema100": stats.get("ema100"),
-                                "is_bullish_breakout": stats.get("is_bullish_breakout", False),
-                                "is_bearish_breakout": stats.get("is_bearish_breakout", False),
-                                "price_change": stats.get("price_change"),
-                                "price_change_percent": stats.get("price_change_percent"),
-                                "samples_collected": stats.get("samples_collected", 0)
-                            }
-                            processed_stocks.append(processed_stock)
-                            
-                            # Log EMAs and any breakout patterns
-                            if processed_stock["current_price"] is not None:
-                                log_msg = f"Stock {stock_id}: Price={processed_stock['current_price']:.2f}"
-                                if processed_stock["ema38"] is not None:
-                                    log_msg += f", EMA38={processed_stock['ema38']:.2f}"
-                                if processed_stock["ema100"] is not None:
-                                    log_msg += f", EMA100={processed_stock['ema100']:.2f}"
-                                if processed_stock["is_bullish_breakout"]:
-                                    log_msg += " 🚨 BULLISH BREAKOUT DETECTED! 🚨"
-                                elif processed_stock["is_bearish_breakout"]:
-                                    log_msg += " 🚨 BEARISH BREAKOUT DETECTED! 🚨"
-                                logger.info(log_msg)
-                            
-                        except Exception as e:
-                            logger.error(f"Error processing stock {stock_id}: {e}")
-                            processed_stocks.append({
-                                "stock_id": stock_id,
-                                "error": str(e)
-                            })
+                    for stock_id, current_price, ema38, ema100, is_bullish_breakout, is_bearish_breakout, price_change, price_change_percent, samples_collected in zip(
+                        stock_ids,
+                        to_optional_list(current_prices),
+                        to_optional_list(stats["ema38"]),
+                        to_optional_list(stats["ema100"]),
+                        stats["is_bullish_breakout"].tolist(),
+                        stats["is_bearish_breakout"].tolist(),
+                        to_optional_list(stats["price_change"]),
+                        to_optional_list(stats["price_change_percent"]),
+                        stats["samples_collected"].tolist()
+                    ):
+                        processed_stock = tick_pool.get(stock_id)
+                        if processed_stock is None:
+                            processed_stock = tick_pool[stock_id] = StockTick(stock_id)
+                        processed_stock.current_price = current_price
+                        processed_stock.ema38 = ema38
+                        processed_stock.ema100 = ema100
+                        processed_stock.is_bullish_breakout = is_bullish_breakout
+                        processed_stock.is_bearish_breakout = is_bearish_breakout
+                        processed_stock.price_change = price_change
+                        processed_stock.price_change_percent = price_change_percent
+                        processed_stock.samples_collected = samples_collected
+                        processed_stocks.append(processed_stock)
+                    
+                    # Log EMAs and any breakout patterns per stock only when debugging
+                    if logger.isEnabledFor(logging.DEBUG):
+                        for processed_stock in processed_stocks:
+                            if processed_stock.current_price is None:
+                                continue
+                            logger.debug(
+                                "Stock %s: Price=%.2f, EMA38=%.2f, EMA100=%.2f%s",
+                                processed_stock.stock_id,
+                                processed_stock.current_price,
+                                processed_stock.ema38,
+                                processed_stock.ema100,
+                                " 🚨 BULLISH BREAKOUT DETECTED! 🚨" if processed_stock.is_bullish_breakout
+                                else " 🚨 BEARISH BREAKOUT DETECTED! 🚨" if processed_stock.is_bearish_breakout
+                                else ""
+                            )
                     
                     # Update latest tick data with processed information
-                    global latest_tick_data
-                    latest_tick_data = {
-                        "timestamp": parsed_data.get("timestamp"),
+                    tick_data = {
+                        "timestamp": tick.timestamp,
                         "trading_time": trading_time,
                         "trading_date": trading_date,
                         "stocks": processed_stocks
                     }
+                    logger.info(
+                        "Processed %d stocks at %s in %.1fms",
+                        len(processed_stocks), trading_time, (time.perf_counter() - started) * 1000
+                    )
                     
                     # Broadcast to WebSocket clients
-                    await broadcast_to_clients(latest_tick_data)
+                    await publish_tick(tick_data)
 
         except Exception as e:
             logger.error(f"Connection error: {e}")
-            await asyncio.sleep(5)  # Wait before reconnecting
+            await asyncio.sleep(reconnect_delay)  # Wait before reconnecting
+            reconnect_delay = min(reconnect_delay * 2, MAX_RECONNECT_DELAY)
 
 @app.on_event("startup")
 async def startup():
-    # Start the WebSocket client
-    asyncio.create_task(connect_to_broadcaster())
+    # Start the WebSocket client, in one worker only when they share state through Redis
+    if redis_client is None:
+        asyncio.create_task(connect_to_broadcaster())
+    else:
+        asyncio.create_task(subscribe_to_ticks())
+        asyncio.create_task(run_tick_processor())
 
 @app.get("/")
 async def root():
     """Display the latest processed stock data"""
-    return latest_tick_data
+    if cached_root is None:
+        return latest_tick_data
+    
+    return Response(content=cached_root, media_type="application/json")
 
 @app.get("/stock/{stock_id}")
 async def get_stock(stock_id: str):
@@ -324,11 +684,7 @@ async def get_stock(stock_id: str):
     if not latest_tick_data or "stocks" not in latest_tick_data:
         return {"error": "No data available"}
     
-    # Find the stock in the list
-    stock_data = next(
-        (stock for stock in latest_tick_data["stocks"] if stock.get("stock_id") == stock_id),
-        None
-    )
+    stock_data = latest_stock_by_id.get(stock_id)
     
     if not stock_data:
         return {"error": f"No data available for stock {stock_id}"}
@@ -343,40 +699,10 @@ async def get_stock(stock_id: str):
 @app.get("/api/stocks")
 async def get_stocks_data():
     """Get current EMA values and prices for all stocks."""
-    if not latest_tick_data or "stocks" not in latest_tick_data:
+    if cached_api_stocks is None:
         raise HTTPException(status_code=404, detail="No stock data available")
     
-    try:
-        stocks_data = []
-        for stock in latest_tick_data["stocks"]:
-            try:
-                stock_data = {
-                    "stock_id": stock.get("stock_id"),
-                    "timestamp": latest_tick_data.get("timestamp"),
-                    "trading_time": latest_tick_data.get("trading_time", ""),
-                    "trading_date": latest_tick_data.get("trading_date", ""),
-                    "current_price": validate_float(stock.get("current_price")),
-                    "ema38": validate_float(stock.get("ema38")),
-                    "ema100": validate_float(stock.get("ema100")),
-                    "is_bullish_breakout": bool(stock.get("is_bullish_breakout")),
-                    "is_bearish_breakout": bool(stock.get("is_bearish_breakout")),
-                    "price_change": validate_float(stock.get("price_change")),
-                    "price_change_percent": validate_float(stock.get("price_change_percent"))
-                }
-                # Remove None values to keep response clean
-                stock_data = {k: v for k, v in stock_data.items() if v is not None}
-                stocks_data.append(stock_data)
-            except Exception as e:
-                logger.error(f"Error processing stock {stock.get('stock_id')}: {e}")
-                continue
-        
-        return {
-            "timestamp": latest_tick_data.get("timestamp"),
-            "stocks": stocks_data
-        }
-    except Exception as e:
-        logger.error(f"Error in get_stocks_data: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error processing stock data")
+    return Response(content=cached_api_stocks, media_type="application/json")
 
 @app.get("/api/stocks/{stock_id}/ema")
 async def get_stock_ema(stock_id: str):
@@ -390,26 +716,27 @@ async def get_stock_ema(stock_id: str):
     if not latest_tick_data or "stocks" not in latest_tick_data:
         raise HTTPException(status_code=404, detail="No stock data available")
     
-    stock_data = latest_tick_data["stocks"].get(stock_id)
+    stock_data = latest_stock_by_id.get(stock_id)
     if not stock_data:
         raise HTTPException(status_code=404, detail=f"No data available for stock {stock_id}")
     
-    return JSONResponse(content={
-        "stock_id": stock_id,
-        "timestamp": latest_tick_data["timestamp"],
-        "trading_time": latest_tick_data["trading_time"],
-        "trading_date": latest_tick_data["trading_date"],
-        "data": {
-            "current_price": stock_data.get("current_price"),
-            "ema38": stock_data.get("ema38"),
-            "ema100": stock_data.get("ema100"),
-            "is_bullish_breakout": bool(stock_data.get("is_bullish_breakout")),
-            "is_bearish_breakout": bool(stock_data.get("is_bearish_breakout")),
-            "price_change": stock_data.get("price_change"),
-            "price_change_percent": stock_data.get("price_change_percent"),
-            "samples_collected": stock_data.get("samples_collected")
-        }
-    })
+    response = StockEmaResponse(
+        stock_id=stock_id,
+        timestamp=latest_tick_data["timestamp"],
+        trading_time=latest_tick_data["trading_time"],
+        trading_date=latest_tick_data["trading_date"],
+        data=StockEmaData(
+            current_price=stock_data.current_price,
+            ema38=stock_data.ema38,
+            ema100=stock_data.ema100,
+            is_bullish_breakout=stock_data.is_bullish_breakout,
+            is_bearish_breakout=stock_data.is_bearish_breakout,
+            price_change=stock_data.price_change,
+            price_change_percent=stock_data.price_change_percent,
+            samples_collected=stock_data.samples_collected
+        )
+    )
+    return Response(content=json_encoder.encode(response), media_type="application/json")
 
 @app.get("/api/breakouts")
 async def get_breakouts():
@@ -418,55 +745,32 @@ async def get_breakouts():
     Returns:
         List of stocks with active breakout patterns
     """
-    if not latest_tick_data or "stocks" not in latest_tick_data:
+    if cached_api_breakouts is None:
         raise HTTPException(status_code=404, detail="No stock data available")
     
-    breakouts = []
-    for stock in latest_tick_data["stocks"]:  # Changed from .items() to direct iteration
-        if stock.get("is_bullish_breakout") or stock.get("is_bearish_breakout"):
-            breakouts.append({
-                "stock_id": stock.get("stock_id"),
-                "is_bullish_breakout": stock.get("is_bullish_breakout", False),
-                "is_bearish_breakout": stock.get("is_bearish_breakout", False),
-                "current_price": stock.get("current_price"),
-                "ema38": stock.get("ema38"),
-                "ema100": stock.get("ema100"),
-                "trading_time": latest_tick_data.get("trading_time")
-            })
-    
-    return JSONResponse(content={
-        "timestamp": latest_tick_data.get("timestamp"),
-        "breakouts": breakouts
-    })
+    return Response(content=cached_api_breakouts, media_type="application/json")
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for streaming stock data"""
+async def websocket_endpoint(websocket: WebSocket, fmt: str = "json"):
+    """WebSocket endpoint for streaming stock data, as JSON or as MessagePack with ?fmt=msgpack"""
     await websocket.accept()
-    active_connections.add(websocket)
+    # Accept first, so the client sees the 1008 close code instead of a rejected handshake
+    if fmt not in ("json", "msgpack"):
+        await websocket.close(code=1008, reason="fmt must be json or msgpack")
+        return
+    queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    # Send initial data. The MessagePack frame is only cached while MessagePack clients are connected
+    initial_frame = cached_client_frame
+    if fmt == "msgpack":
+        initial_frame = cached_client_frame_msgpack
+        if initial_frame is None and cached_client_frame is not None:
+            initial_frame = msgpack_encoder.encode(format_for_clients(latest_tick_data))
+    if initial_frame is not None:
+        queue.put_nowait(initial_frame)
+    active_connections[websocket] = (queue, fmt)
+    writer = asyncio.create_task(send_queued_frames(websocket, queue))
     
     try:
-        # Send initial data
-        if latest_tick_data:
-            formatted_data = {
-                "timestamp": latest_tick_data.get("timestamp"),
-                "stocks": [
-                    {
-                        "stock_id": stock.get("stock_id"),
-                        "current_price": validate_float(stock.get("current_price")),
-                        "ema38": validate_float(stock.get("ema38")),
-                        "ema100": validate_float(stock.get("ema100")),
-                        "is_bullish_breakout": bool(stock.get("is_bullish_breakout")),
-                        "is_bearish_breakout": bool(stock.get("is_bearish_breakout")),
-                        "price_change": validate_float(stock.get("price_change")),
-                        "price_change_percent": validate_float(stock.get("price_change_percent")),
-                        "trading_time": latest_tick_data.get("trading_time")
-                    }
-                    for stock in latest_tick_data.get("stocks", [])
-                ]
-            }
-            await websocket.send_json(formatted_data)
-        
         # Keep connection alive and handle client messages if needed
         while True:
             data = await websocket.receive_text()
@@ -477,7 +781,11 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
-        active_connections.remove(websocket)
+        writer.cancel()
+        active_connections.pop(websocket, None)
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8002, reload=True)
\ No newline at end of file
+    # Reloading only works with a single worker. Frames are small, so they are sent uncompressed
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    uvicorn.run("main:app", host="0.0.0.0", port=8002, reload=workers == 1, workers=workers,
+                loop="uvloop", http="httptools", ws="websockets", ws_per_message_deflate=False)
\ No newline at end of file
@@ -2,11 +2,14 @@ import asyncio
 import aiohttp
 from fastapi import FastAPI, WebSocket
 from datetime import datetime
-import json
+import msgspec
 import logging
 import uvicorn
-import pandas as pd
-from typing import List, Dict
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from typing import Dict, Optional
 import os
 
 # Configure logging
@@ -15,136 +18,191 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Stock Data Broadcasting Service")
 
-# Store active websocket connections
-active_connections: List[WebSocket] = []
+# Store active websocket connections with the queue of messages waiting to be sent to each
+active_connections: Dict[WebSocket, asyncio.Queue] = {}
 
 # Global variables to store the data
 stock_data = None
-current_index = 0
-last_known_prices = {}  # Dictionary to store last known prices for each stock
+current_index = 0  # Position in trading_times of the next tick to send
+
+# Tick data precomputed by load_stock_data, with one row per trading time
+# and one column per stock in STOCK_IDS
+trading_times = None  # Trading times in order
+trading_dates = None  # Trading date of the first record at each trading time
+tick_prices = None  # Price of a stock at each time, forward-filled with its last known price, NaN if none yet
+tick_is_current = None  # Whether a stock's price at each time comes from a record at that time
+tick_sec_types = None  # SecType of a stock's first record at each time, or of its last record if it has none
+
+# Ticks are sent to the data processor as MessagePack
+tick_encoder = msgspec.msgpack.Encoder()
+# The latest encoded tick, sent to clients as soon as they connect
+latest_message: Optional[bytes] = None
+
+# Seconds between ticks
+TICK_INTERVAL = 1.0
+# The worker logs progress once every this many ticks instead of on every tick
+LOG_EVERY_TICKS = 60
+
+# How many messages may wait for a slow client before its oldest message is dropped
+CLIENT_QUEUE_SIZE = 32
 
 # Define allowed stocks
 ALLOWED_STOCKS = {'A1EX2F.ETR', 'ALORA.FR', 'IJPHG.FR'}
+STOCK_IDS = sorted(ALLOWED_STOCKS)
+
+# Columns read from the data file; missing prices are null
+COLUMN_TYPES = {
+    'ID': pa.string(),
+    'SecType': pa.string(),
+    'Last': pa.float64(),
+    'Trading time': pa.string(),
+    'Trading date': pa.string()
+}
 
 def load_stock_data():
-    """Load stock data from CSV file"""
-    global stock_data, last_known_prices
-    csv_path = '../data/extracted_stocks.csv'
-    
-    if not os.path.exists(csv_path):
-        raise FileNotFoundError(f"Could not find {csv_path}. Please run data_extractor.py first.")
-    
-    logger.info(f"Loading stock data from {csv_path}")
-    stock_data = pd.read_csv(csv_path)
-    
-    # Initialize last known prices
-    last_known_prices = {stock: None for stock in ALLOWED_STOCKS}
-    
-    # Filter only allowed stocks
-    stock_data = stock_data[stock_data['ID'].isin(ALLOWED_STOCKS)]
-    stock_data = stock_data.sort_values(['Trading time'])
-    
-    # Fill empty prices with NaN for proper handling
-    stock_data['Last'] = pd.to_numeric(stock_data['Last'], errors='coerce')
+    """Load stock data from the Parquet file written by data_extractor.py"""
+    global stock_data, current_index
+    global trading_times, trading_dates, tick_prices, tick_is_current, tick_sec_types
+    data_path = '../data/extracted_stocks.parquet'
+    
+    if not os.path.exists(data_path):
+        raise FileNotFoundError(f"Could not find {data_path}. Please run data_extractor.py first.")
+    
+    logger.info(f"Loading stock data from {data_path}")
+    # Dictionary-encoded columns are cast back to plain strings, which Arrow can sort
+    stock_data = pq.read_table(data_path, columns=list(COLUMN_TYPES)).cast(pa.schema(COLUMN_TYPES))
+    
+    # Filter only allowed stocks, sorted by trading time (the sort is stable)
+    stock_data = stock_data.filter(pc.is_in(stock_data['ID'], value_set=pa.array(STOCK_IDS)))
+    stock_data = stock_data.take(pc.sort_indices(stock_data, sort_keys=[('Trading time', 'ascending')]))
+    
+    ids = stock_data['ID'].to_numpy(zero_copy_only=False)
+    sec_types = stock_data['SecType'].to_numpy(zero_copy_only=False)
+    # Empty prices are read as NaN
+    prices = stock_data['Last'].to_numpy(zero_copy_only=False)
+    
+    # Precompute every tick once so fetching a tick is a row lookup instead of a scan
+    trading_times, first_per_time, rows = np.unique(
+        stock_data['Trading time'].to_numpy(zero_copy_only=False), return_index=True, return_inverse=True
+    )
+    trading_dates = stock_data['Trading date'].to_numpy(zero_copy_only=False)[first_per_time]
+    
+    columns = np.searchsorted(STOCK_IDS, ids)
+    _, first_records = np.unique(rows * len(STOCK_IDS) + columns, return_index=True)
+    rows = rows[first_records]
+    columns = columns[first_records]
+    shape = (len(trading_times), len(STOCK_IDS))
+    tick_prices = np.full(shape, np.nan)
+    tick_prices[rows, columns] = prices[first_records]
+    tick_is_current = ~np.isnan(tick_prices)
+    # Forward-fill each stock's last known price: take the price from the latest row with one
+    last_rows = np.maximum.accumulate(np.where(tick_is_current, np.arange(shape[0])[:, None], 0), axis=0)
+    tick_prices = tick_prices[last_rows, np.arange(shape[1])]
+    # Later records overwrite earlier ones, leaving each stock's last SecType
+    last_sec_types = dict(zip(ids.tolist(), sec_types.tolist()))
+    tick_sec_types = np.array([[last_sec_types.get(stock_id) for stock_id in STOCK_IDS]] * shape[0], dtype=object)
+    tick_sec_types[rows, columns] = sec_types[first_records]
+    current_index = 0
     
     # Verify we have all required stocks
-    found_stocks = set(stock_data['ID'].unique())
+    found_stocks = set(last_sec_types)
     missing_stocks = ALLOWED_STOCKS - found_stocks
     if missing_stocks:
         logger.warning(f"Missing data for stocks: {missing_stocks}")
     
-    logger.info(f"Loaded {len(stock_data)} records for stocks: {sorted(found_stocks)}")
+    logger.info(f"Loaded {stock_data.num_rows} records for stocks: {sorted(found_stocks)}")
 
 async def fetch_stock_data() -> Dict:
     """Fetch the next batch of stock data"""
-    global current_index, stock_data, last_known_prices
+    global current_index, stock_data, tick_prices
     
     if stock_data is None:
         load_stock_data()
     
     # Reset index if we've reached the end
-    if current_index >= len(stock_data):
+    if current_index >= len(trading_times):
         current_index = 0
+        # Stocks without a price yet carry over their last price from the previous pass
+        tick_prices = np.where(np.isnan(tick_prices), tick_prices[-1], tick_prices)
         logger.info("Reached end of data, starting over")
     
-    # Get current timestamp and find all records for this timestamp
-    current_time = stock_data.iloc[current_index]['Trading time']
-    current_batch = stock_data[stock_data['Trading time'] == current_time]
-    
     # Prepare the data structure
+    row = current_index
     current_data = {
-        "trading_time": current_time,
-        "trading_date": current_batch.iloc[0]['Trading date'],
+        "trading_time": trading_times[row],
+        "trading_date": trading_dates[row],
         "stocks": {}
     }
     
-    # Process each allowed stock
-    for stock_id in ALLOWED_STOCKS:
-        stock_row = current_batch[current_batch['ID'] == stock_id]
-        
-        if not stock_row.empty:
-            price = stock_row.iloc[0]['Last']
-            if pd.isna(price):  # If price is empty/NaN
-                if last_known_prices[stock_id] is not None:
-                    price = last_known_prices[stock_id]
-                    logger.debug(f"Using last known price {price} for {stock_id}")
-            else:
-                last_known_prices[stock_id] = float(price)
-                logger.debug(f"Updated last known price to {price} for {stock_id}")
-            
-            if not pd.isna(price):  # Only add if we have a valid price
-                current_data["stocks"][stock_id] = {
-                    "price": float(price),
-                    "sec_type": stock_row.iloc[0]['SecType'],
-                    "price_type": "last_known" if pd.isna(stock_row.iloc[0]['Last']) else "current"
-                }
-        else:
-            # If no data for this stock at this timestamp, use last known price
-            if last_known_prices[stock_id] is not None:
-                current_data["stocks"][stock_id] = {
-                    "price": last_known_prices[stock_id],
-                    "sec_type": stock_data[stock_data['ID'] == stock_id].iloc[-1]['SecType'],
-                    "price_type": "last_known"
-                }
-                logger.debug(f"No data for {stock_id}, using last known price {last_known_prices[stock_id]}")
+    # Add each allowed stock that has a price, current or last known
+    prices = tick_prices[row].tolist()
+    for column, stock_id in enumerate(STOCK_IDS):
+        price = prices[column]
+        if price == price:  # Not NaN
+            current_data["stocks"][stock_id] = {
+                "price": price,
+                "sec_type": tick_sec_types[row, column],
+                "price_type": "current" if tick_is_current[row, column] else "last_known"
+            }
     
     # Move to next timestamp
-    next_time_idx = stock_data[stock_data['Trading time'] > current_time].index
-    if len(next_time_idx) > 0:
-        current_index = next_time_idx[0]
-    else:
-        current_index = 0  # Reset to beginning if no next timestamp
+    current_index = row + 1
     
     return current_data
 
 async def broadcast_stock_data(data: Dict):
     """Broadcast stock data to all connected clients"""
-    if not active_connections:
-        return
-    
-    message = json.dumps({
+    global latest_message
+    message = latest_message = tick_encoder.encode({
         "timestamp": datetime.now().isoformat(),
         "data": data
     })
     
-    for connection in active_connections:
-        try:
-            await connection.send_text(message)
-        except Exception as e:
-            logger.error(f"Error broadcasting to client: {e}")
-            active_connections.remove(connection)
+    # Queue the message for all connected clients, so a slow client only delays its own messages
+    for queue in active_connections.values():
+        if queue.full():
+            queue.get_nowait()
+            logger.warning("Client is falling behind, dropping its oldest message")
+        queue.put_nowait(message)
+
+async def send_queued_messages(websocket: WebSocket, queue: asyncio.Queue):
+    """Send the messages queued for a client until sending fails"""
+    try:
+        while True:
+            await websocket.send_bytes(await queue.get())
+    except Exception as e:
+        logger.error(f"Error broadcasting to client: {e}")
+        active_connections.pop(websocket, None)
 
 async def stock_data_worker():
     """Worker that streams stock data every second"""
+    global current_index
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    ticks_sent = 0
     while True:
         try:
             data = await fetch_stock_data()
             await broadcast_stock_data(data)
-            logger.info(f"Broadcast data for {len(data['stocks'])} stocks at {data['trading_time']}")
-            await asyncio.sleep(1)  # Stream data every second
+            ticks_sent += 1
+            if ticks_sent % LOG_EVERY_TICKS == 0:
+                logger.info("Broadcast %d ticks, the latest for %d stocks at %s",
+                            ticks_sent, len(data['stocks']), data['trading_time'])
+            # Schedule ticks on the loop clock so the time spent sending does not add up
+            next_tick += TICK_INTERVAL
+            delay = next_tick - loop.time()
+            if delay < -TICK_INTERVAL:
+                # Skip the ticks that are already late instead of sending them in a burst
+                skipped = int(-delay / TICK_INTERVAL)
+                current_index = min(current_index + skipped, len(trading_times))
+                next_tick = loop.time()
+                logger.warning("Worker fell behind, skipping %d ticks", skipped)
+            else:
+                await asyncio.sleep(max(0, delay))
         except Exception as e:
             logger.error(f"Error in worker: {e}")
             await asyncio.sleep(10)
+            next_tick = loop.time()
 
 @app.on_event("startup")
 async def startup():
@@ -156,14 +214,12 @@ async def startup():
 @app.websocket("/ws/stocks")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    active_connections.append(websocket)
-    
-    # Send initial data immediately upon connection
-    initial_data = await fetch_stock_data()
-    await websocket.send_text(json.dumps({
-        "timestamp": datetime.now().isoformat(),
-        "data": initial_data
-    }))
+    queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    # Send the latest tick immediately upon connection, without advancing the replay
+    if latest_message is not None:
+        queue.put_nowait(latest_message)
+    active_connections[websocket] = queue
+    writer = asyncio.create_task(send_queued_messages(websocket, queue))
     
     try:
         while True:
@@ -171,7 +227,8 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
-        active_connections.remove(websocket)
+        writer.cancel()
+        active_connections.pop(websocket, None)
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, loop="uvloop", http="httptools", ws="websockets")
\ No newline at end of file
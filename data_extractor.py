@@ -1,12 +1,63 @@
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv
+import io
 import os
 from datetime import datetime
 
 # Define the target stocks
 TARGET_STOCKS = {'A1EX2F.ETR', 'A2GS63.ETR', 'ALORA.FR', 'IJPHG.FR', 'MLECE.FR'}
 
+class CommentFilter(io.RawIOBase):
+    """
+    A byte stream over a CSV file without its first skip_lines lines and without any
+    line starting with '#', as pandas' skiprows and comment='#' would read it.
+    Arrow's CSV reader has no comment option, so the lines are dropped before it sees them.
+    """
+    def __init__(self, raw, skip_lines=0, chunk_size=1 << 20):
+        self._raw = raw
+        self._skip_lines = skip_lines
+        self._chunk_size = chunk_size
+        self._partial_line = b''
+        self._pending = memoryview(b'')
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and not self._eof:
+            self._pending = memoryview(self._next_chunk())
+        count = min(len(buffer), len(self._pending))
+        buffer[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        return count
+
+    def _next_chunk(self):
+        """Read the next complete lines of the file and drop the skipped and commented ones"""
+        data = self._raw.read(self._chunk_size)
+        if not data:
+            self._eof = True
+            chunk, self._partial_line = self._partial_line, b''
+        else:
+            end = data.rfind(b'\n') + 1
+            if not end:
+                self._partial_line += data
+                return b''
+            chunk, self._partial_line = self._partial_line + data[:end], data[end:]
+        
+        while self._skip_lines and chunk:
+            end = chunk.find(b'\n') + 1
+            chunk = chunk[end:] if end else b''
+            self._skip_lines -= 1
+        
+        # Most chunks have no comments, so only split the ones that do
+        if chunk.startswith(b'#') or b'\n#' in chunk:
+            chunk = b'\n'.join(line for line in chunk.split(b'\n') if not line.startswith(b'#'))
+        return chunk
+
 def extract_stocks(input_file='data/debs2022-gc-trading-day-08-11-21.csv', 
-                  output_file='data/extracted_stocks.csv'):
+                  output_file='data/extracted_stocks.parquet'):
     """
     Extract data for specific stocks from the input CSV file.
     Selects columns by their index positions:
@@ -18,43 +69,63 @@ def extract_stocks(input_file='data/debs2022-gc-trading-day-08-11-21.csv',
     """
     print(f"Starting data extraction from {input_file}")
     
-    # Read the CSV file in chunks to handle large file size
-    chunk_size = 100000
-    chunks_to_concat = []
-    
     # Specify the columns we want to keep by their index positions
     columns_to_keep = [0, 1, 21, 23, 26]  # Corresponding to the required fields
     column_names = ['ID', 'SecType', 'Last', 'Trading time', 'Trading date']
+    column_types = [pa.string(), pa.string(), pa.float64(), pa.string(), pa.string()]
+    # Columns are read without a header, so Arrow names them f0, f1, ...
+    arrow_columns = [f"f{index}" for index in columns_to_keep]
+    # IDs are read dictionary-encoded, so filtering compares each distinct ID in a block once
+    read_types = dict(zip(arrow_columns, column_types), f0=pa.dictionary(pa.int32(), pa.string()))
     
     # Create a directory for the output file if it doesn't exist
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
     
-    # Process the file in chunks
-    for chunk in pd.read_csv(input_file, 
-                           chunksize=chunk_size,
-                           usecols=columns_to_keep,
-                           names=column_names,
-                           skiprows=9,  # Skip the metadata rows
-                           comment='#'  # Skip any additional comment lines
-                           ):
-        # Filter the chunk to only include target stocks
-        filtered_chunk = chunk[chunk['ID'].isin(TARGET_STOCKS)]
-        if not filtered_chunk.empty:
-            chunks_to_concat.append(filtered_chunk)
+    # Stream the file in blocks to handle large file size, skipping the 9 metadata rows
+    # and any additional comment lines before they reach the CSV parser
+    with open(input_file, 'rb') as raw:
+        reader = csv.open_csv(
+            io.BufferedReader(CommentFilter(raw, skip_lines=9)),
+            read_options=csv.ReadOptions(
+                autogenerate_column_names=True,
+                block_size=16 << 20
+            ),
+            convert_options=csv.ConvertOptions(
+                include_columns=arrow_columns,
+                column_types=read_types
+            )
+        )
+        
+        # Filter each block to only include target stocks before converting anything to pandas
+        target_ids = pa.array(sorted(TARGET_STOCKS))
+        batches_to_concat = []
+        for batch in reader:
+            ids = batch.column('f0')
+            is_target = pc.take(pc.is_in(ids.dictionary, value_set=target_ids), ids.indices)
+            filtered_batch = batch.filter(is_target)
+            if filtered_batch.num_rows:
+                batches_to_concat.append(filtered_batch)
     
-    if not chunks_to_concat:
+    if not batches_to_concat:
         print("No data found for target stocks!")
         return
     
-    # Combine all filtered chunks
+    # Combine all filtered blocks without copying them
     print(f"Processing data for stocks: {sorted(TARGET_STOCKS)}")
-    result_df = pd.concat(chunks_to_concat, ignore_index=True)
+    result_table = pa.Table.from_batches(batches_to_concat).select(arrow_columns).rename_columns(column_names)
+    del batches_to_concat
+    # Arrow can't sort dictionary columns, so decode the few remaining IDs
+    result_table = result_table.cast(pa.schema(dict(zip(column_names, column_types))))
     
     # Sort the data by ID and timestamp
-    result_df = result_df.sort_values(['ID', 'Trading time'])
+    result_table = result_table.sort_by([('ID', 'ascending'), ('Trading time', 'ascending')])
+    
+    # Convert once, with the repetitive string columns as categoricals
+    result_df = result_table.to_pandas(strings_to_categorical=True)
+    del result_table
     
-    # Save to CSV
-    result_df.to_csv(output_file, index=False)
+    # Save to Parquet, which keeps the column types and loads much faster than CSV
+    result_df.to_parquet(output_file, index=False, compression='zstd')
     print(f"\nExtraction Statistics:")
     print(f"Total rows extracted: {len(result_df)}")
     print(f"\nRows per stock:")
@@ -24,6 +24,9 @@ interface ApiResponse {
   stocks: StockData[]
 }
 
+// The server sends UTF-8 encoded JSON as binary frames
+const frameDecoder = new TextDecoder()
+
 function App() {
   const [stocksData, setStocksData] = useState<ApiResponse | null>(null)
   const [error, setError] = useState<string | null>(null)
@@ -33,6 +36,7 @@ function App() {
   useEffect(() => {
     const connectWebSocket = () => {
       const ws = new WebSocket('ws://localhost:8002/ws')
+      ws.binaryType = 'arraybuffer'
       wsRef.current = ws
 
       ws.onopen = () => {
@@ -42,7 +46,9 @@ function App() {
 
       ws.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data)
+          const data = JSON.parse(
+            typeof event.data === 'string' ? event.data : frameDecoder.decode(event.data)
+          )
           setStocksData(data)
 
           // Check for breakouts and show notifications
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from data_extractor import extract_stocks
+
+COLUMN_COUNT = 39
+
+def make_row(stock_id, price, trading_time):
+    fields = [''] * COLUMN_COUNT
+    fields[0] = stock_id
+    fields[1] = 'E'
+    fields[21] = str(price)
+    fields[23] = trading_time
+    fields[26] = '08-11-2021'
+    return ','.join(fields)
+
+def write_input(path, rows):
+    metadata = [f'# metadata line {index}' for index in range(8)]
+    # A metadata row that would otherwise be read as a target stock's data row
+    metadata.append(make_row('ALORA.FR', 99.0, '07:59:59.000'))
+    path.write_text('\n'.join(metadata + rows) + '\n')
+
+def test_skips_comment_lines(tmp_path):
+    header = ['ID', 'SecType'] + [f'col{index}' for index in range(2, COLUMN_COUNT)]
+    header[21] = 'Last'
+    rows = [
+        # A comment right after the metadata rows
+        '# leading comment',
+        make_row('ALORA.FR', 10.5, '08:00:00.000'),
+        make_row('OTHER.FR', 1.0, '08:00:00.000'),
+        # A commented-out header with the full number of columns
+        '#' + ','.join(header),
+        make_row('MLECE.FR', 20.25, '08:00:01.000'),
+        make_row('ALORA.FR', 10.75, '08:00:02.000'),
+    ]
+    input_file = tmp_path / 'input.csv'
+    output_file = tmp_path / 'out' / 'extracted.parquet'
+    write_input(input_file, rows)
+    
+    extract_stocks(str(input_file), str(output_file))
+    
+    result = pd.read_parquet(output_file)
+    assert result['ID'].astype(str).tolist() == ['ALORA.FR', 'ALORA.FR', 'MLECE.FR']
+    assert result['Last'].tolist() == [10.5, 10.75, 20.25]
+    assert result['Trading time'].astype(str).tolist() == ['08:00:00.000', '08:00:02.000', '08:00:01.000']
@@ -0,0 +1,66 @@
+import asyncio
+import importlib.util
+import os
+import tempfile
+
+import numpy as np
+
+# Numba caches the kernel under the name the module is loaded as, so keep this copy's
+# cache out of data-processor/__pycache__, where the running service would load it.
+# Numba reads this when it is first imported, by the module below
+os.environ['NUMBA_CACHE_DIR'] = tempfile.mkdtemp()
+
+spec = importlib.util.spec_from_file_location(
+    'processor_main', os.path.join(os.path.dirname(__file__), '..', 'data-processor', 'main.py')
+)
+processor = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(processor)
+
+class FakeLock:
+    """A processor lock that is always acquired and then held until the test ends"""
+    async def acquire(self, blocking=True):
+        return True
+
+    async def reacquire(self):
+        await asyncio.Event().wait()
+
+class FakeRedis:
+    def lock(self, *args, **kwargs):
+        return FakeLock()
+
+def test_lock_acquisition_starts_from_fresh_state(monkeypatch):
+    # State left over from ticks processed before another worker took over
+    for price in (10.0, 11.0, 12.0):
+        processor.batch_calculate_statistics(['ALORA.FR'], np.array([price]))
+    processor.tick_pool['ALORA.FR'] = processor.StockTick('ALORA.FR')
+    
+    async def handover():
+        seen = asyncio.Queue()
+        
+        async def consumer():
+            await seen.put((
+                dict(processor.stock_index),
+                dict(processor.tick_pool),
+                processor.samples_written.copy(),
+                processor.previous_emas_38.copy()
+            ))
+        
+        monkeypatch.setattr(processor, 'redis_client', FakeRedis())
+        monkeypatch.setattr(processor, 'connect_to_broadcaster', consumer)
+        monkeypatch.setattr(processor, 'PROCESSOR_LOCK_TIMEOUT', 0.03)
+        task = asyncio.create_task(processor.run_tick_processor())
+        try:
+            return await asyncio.wait_for(seen.get(), timeout=1)
+        finally:
+            task.cancel()
+    
+    stock_index, tick_pool, samples_written, previous_emas_38 = asyncio.run(handover())
+    assert stock_index == {}
+    assert tick_pool == {}
+    assert not samples_written.any()
+    assert not previous_emas_38.any()
+    
+    # The first ticks after the handover start new EMAs instead of crossing stale ones
+    stats = processor.batch_calculate_statistics(['ALORA.FR'], np.array([20.0]))
+    assert stats['ema38'][0] == 20.0
+    assert stats['samples_collected'][0] == 1